@@ -8,21 +8,53 @@ from lxml import etree as ET
 XS_NS = "http://www.w3.org/2001/XMLSchema"
 def q(local): return f"{{{XS_NS}}}{local}"
 
-# Globals we care about for naming
-GLOBAL_DEFINITIONS = (q("complexType"), q("simpleType"))
-GLOBAL_COMPONENTS = (q("element"), q("complexType"), q("simpleType"))
+# Globals we care about for naming (frozensets: tag checks are hash lookups)
+GLOBAL_DEFINITIONS = frozenset((q("complexType"), q("simpleType")))
+GLOBAL_COMPONENTS = frozenset((q("element"), q("complexType"), q("simpleType")))
 
 # Attributes that reference a type name
-REF_ATTRS = ("type", "base", "ref")
+REF_ATTRS = tuple(sys.intern(s) for s in ("type", "base", "ref"))
+REF_SET = frozenset(REF_ATTRS)
 
 def get_global_names(root):
     """Returns a set of names for all global elements, complexTypes, and simpleTypes."""
     names = set()
+    add = names.add
     for child in root:
-        if child.tag in GLOBAL_COMPONENTS and "name" in child.attrib:
-            names.add(child.attrib["name"])
+        if child.tag in GLOBAL_COMPONENTS:
+            name = child.get("name")
+            if name is not None:
+                add(name)
     return names
 
+def iter_ref_updates(root, rename_plan):
+    """Yields (element, attribute, new_value) for every reference to rewrite."""
+    # Reference values repeat heavily (the same "tns:Foo" everywhere), so each
+    # distinct value is looked up and rebuilt once; None records a miss
+    rewritten = {}
+    for elem in root.iter('*'):
+        a = elem.attrib
+        # Most elements carry none of the reference attributes; skip them early
+        if REF_SET.isdisjoint(a):
+            continue
+        a_get = a.get
+        for attr_name in REF_ATTRS:
+            attr_value = a_get(attr_name)
+            if not attr_value:
+                continue
+
+            if attr_value in rewritten:
+                new_value = rewritten[attr_value]
+            else:
+                # Keeps any namespace prefix (like tns:MyType) in front of the new name
+                i = attr_value.find(":") + 1
+                new_local_name = rename_plan.get(attr_value[i:])
+                new_value = rewritten[attr_value] = (
+                    attr_value[:i] + new_local_name if new_local_name is not None else None
+                )
+            if new_value is not None:
+                yield elem, attr_name, new_value
+
 def main():
     ap = argparse.ArgumentParser(
         description="Merges an original XSD with a collision-fixed XSD to produce a final, valid schema."
@@ -32,11 +64,14 @@ def main():
     ap.add_argument("output_xsd", help="Path for the final, corrected .xsd output file.")
     args = ap.parse_args()
 
-    # Use a parser that preserves comments and structure
-    parser = ET.XMLParser(remove_blank_text=False, recover=True)
+    # Use a parser that preserves comments and structure; huge_tree lifts
+    # libxml2's size limits for very large schemas
+    parser = ET.XMLParser(remove_blank_text=False, huge_tree=True, collect_ids=False, recover=True)
     
     # --- Step 1: Analyze both files to find ambiguous names ---
     print("Analyzing schemas to find ambiguous names...")
+    # Full DOMs: the original is rewritten in place below (for name discovery
+    # alone, find_collisions.iter_globals streams instead)
     original_tree = ET.parse(args.original_xsd, parser)
     original_root = original_tree.getroot()
     original_globals = get_global_names(original_root)
@@ -52,11 +87,12 @@ def main():
     ambiguous_names = set()
     for renamed in renamed_components:
         # Heuristic: assume the original name is the part before "_x" or "_R"
+        # (partition stops at the first match and builds no list)
         if "_x" in renamed:
-            base_name = renamed.split("_x")[0]
+            base_name = renamed.partition("_x")[0]
             ambiguous_names.add(base_name)
         elif "_R" in renamed: # for _Rq, _Rs
-            base_name = renamed.split("_R")[0]
+            base_name = renamed.partition("_R")[0]
             ambiguous_names.add(base_name)
 
     if not ambiguous_names:
@@ -67,44 +103,35 @@ def main():
 
     # --- Step 2: Create the new naming plan ---
     # The plan is to rename types with a "Type" suffix
-    rename_plan = {name: f"{name}Type" for name in ambiguous_names}
+    # Interned so the keys' hashes are cached and equal strings share one object
+    rename_plan = {sys.intern(name): sys.intern(f"{name}Type") for name in ambiguous_names}
 
     # --- Step 3: Apply changes to the original schema tree ---
     
     # Part A: Rename the actual type definitions
-    print("Renaming global type definitions...")
+    # Log lines are collected and written once rather than printed per rename
+    log_lines = ["Renaming global type definitions..."]
     for child in original_root:
         if child.tag in GLOBAL_DEFINITIONS and child.attrib.get("name") in rename_plan:
             old_name = child.attrib["name"]
             new_name = rename_plan[old_name]
-            print(f"  - Renaming <{child.tag.split('}')[1]}> '{old_name}' -> '{new_name}'")
+            log_lines.append(f"  - Renaming <{child.tag.split('}')[1]}> '{old_name}' -> '{new_name}'")
             child.set("name", new_name)
+    sys.stdout.write("\n".join(log_lines) + "\n")
 
     # Part B: Update all references throughout the entire document
     print("Updating all references to new type names...")
     update_count = 0
-    for elem in original_root.iter('*'):
-        for attr_name in REF_ATTRS:
-            attr_value = elem.get(attr_name)
-            if not attr_value:
-                continue
-
-            # Handle potential namespace prefixes (like tns:MyType)
-            prefix = ""
-            local_name = attr_value
-            if ":" in attr_value:
-                prefix, local_name = attr_value.split(":", 1)
-                prefix += ":"
-            
-            if local_name in rename_plan:
-                new_local_name = rename_plan[local_name]
-                new_value = prefix + new_local_name
-                elem.set(attr_name, new_value)
-                update_count += 1
+    for elem, attr_name, new_value in iter_ref_updates(original_root, rename_plan):
+        elem.set(attr_name, new_value)
+        update_count += 1
     
     print(f"Updated {update_count} references.")
 
     # --- Step 4: Write the final, corrected schema ---
+    # Writing to a path streams through libxml2's output buffer, so the document
+    # is never held as one string. xmlfile() would not save memory here and
+    # cannot write comments that follow the root element.
     original_tree.write(
         args.output_xsd,
         pretty_print=True,
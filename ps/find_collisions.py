@@ -11,13 +11,37 @@ except Exception:
 
 XS_NS = "http://www.w3.org/2001/XMLSchema"
 def q(local): return f"{{{XS_NS}}}{local}"
-GLOBAL_KINDS = (q("element"), q("complexType"), q("simpleType"))
+GLOBAL_KINDS = frozenset((q("element"), q("complexType"), q("simpleType")))
 
 def localname(tag): return tag.split('}',1)[1] if '}' in tag else tag
-def load_tree(path):
-    if HAVE_LXML:
-        return ET.parse(path, ET.XMLParser(remove_blank_text=False))
-    return ET.parse(path)
+def iter_globals(path):
+    """
+    Stream the schema and yield (name, kind, line) for each named global decl.
+    Only direct children of xs:schema are inspected; each one is discarded
+    after it has been seen so memory stays flat on very large files.
+    """
+    depth = 0
+    root = None
+    opts = {"huge_tree": True, "collect_ids": False} if HAVE_LXML else {}
+    for event, elem in ET.iterparse(path, events=("start", "end"), **opts):
+        if event == "start":
+            depth += 1
+            if root is None:
+                root = elem
+                if root.tag != q("schema"):
+                    print("Error: root is not xs:schema", file=sys.stderr); sys.exit(2)
+            continue
+        depth -= 1
+        if depth != 1:
+            continue
+        if elem.tag in GLOBAL_KINDS and "name" in elem.attrib:
+            yield elem.attrib["name"], localname(elem.tag), getattr(elem, "sourceline", None) if HAVE_LXML else None
+        elem.clear()
+        if HAVE_LXML:
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+        else:
+            root.remove(elem)
 
 def main():
     ap = argparse.ArgumentParser(description="Find duplicate global XSD names.")
@@ -25,18 +49,9 @@ def main():
     ap.add_argument("--json", help="Optional JSON output")
     args = ap.parse_args()
 
-    tree = load_tree(args.xsd)
-    root = tree.getroot()
-    if root.tag != q("schema"):
-        print("Error: root is not xs:schema", file=sys.stderr); sys.exit(2)
-
     by_name = defaultdict(list)
-    for ch in root:
-        if ch.tag in GLOBAL_KINDS and "name" in ch.attrib:
-            by_name[ch.attrib["name"]].append({
-                "kind": localname(ch.tag),
-                "line": getattr(ch, "sourceline", None) if HAVE_LXML else None
-            })
+    for name, kind, line in iter_globals(args.xsd):
+        by_name[name].append({"kind": kind, "line": line})
     dupes = {k:v for k,v in by_name.items() if len(v) > 1}
     if not dupes:
         print("✅ No duplicate global names found.")
@@ -2,29 +2,21 @@
 # fix_collisions.py
 import argparse, sys
 from collections import defaultdict
+from operator import itemgetter
 
 try:
     from lxml import etree as ET
-    HAVE_LXML = True
-except Exception:
-    import xml.etree.ElementTree as ET
-    HAVE_LXML = False
+except ImportError:
+    sys.exit("fix_collisions.py requires lxml (pip install lxml)")
 
 XS_NS = "http://www.w3.org/2001/XMLSchema"
 def q(local): return f"{{{XS_NS}}}{local}"
-GLOBAL_KINDS = (q("element"), q("complexType"), q("simpleType"))
-REF_ATTRS = ("type", "base", "ref")
+GLOBAL_KINDS = frozenset((q("element"), q("complexType"), q("simpleType")))
+REF_ATTRS = tuple(sys.intern(s) for s in ("type", "base", "ref"))
 
 def localname(tag): return tag.split('}',1)[1] if '}' in tag else tag
 def load_tree(path):
-    if HAVE_LXML:
-        return ET.parse(path, ET.XMLParser(remove_blank_text=False))
-    return ET.parse(path)
-
-def iter_all(e):
-    yield e
-    for c in list(e):
-        yield from iter_all(c)
+    return ET.parse(path, ET.XMLParser(remove_blank_text=False, huge_tree=True, collect_ids=False))
 
 def text_blob(elem):
     try:
@@ -39,6 +31,9 @@ def guess_affinity(elem):
       - child/@name, @type, @base containing 'Rq' or 'Rs'
       - inner text with 'request'/'response'
       - attributes like 'RqEchoFlag', 'EchoFlag'
+    The keyword counts run over the serialized subtree, so tag and attribute
+    names and the xmlns declarations count too; tostring() is C-level and
+    cheaper than collecting the same pieces in a Python walk.
     """
     blob = text_blob(elem).lower()
     rq = blob.count("request") + blob.count("rqecho") + blob.count(">rq<")
@@ -71,71 +66,69 @@ def main():
         print("Error: root is not xs:schema", file=sys.stderr); sys.exit(2)
 
     # 1) collect global decls by name (preserve order)
-    order = []
-    by_name = defaultdict(list)
-    for ch in root:
+    by_name = defaultdict(list)     # name -> [(position, node)]
+    for pos, ch in enumerate(root):
         if ch.tag in GLOBAL_KINDS and "name" in ch.attrib:
-            order.append(ch)
-            by_name[ch.attrib["name"]].append(ch)
+            by_name[ch.attrib["name"]].append((pos, ch))
 
     # 2) build rename plan
-    rename_plan = {}                # node-id -> (old, new)
+    planned = []                    # (position, node, old, new)
     canonical_name = {}             # old -> old (explicit for clarity)
     chosen_names = set(by_name.keys())
 
     for name, nodes in by_name.items():
         if len(nodes) <= 1:
             continue
+        name = sys.intern(name)     # cached hash for the reference-pass lookups
         canonical_name[name] = name
+        # highest fallback number already probed for this name; every number
+        # below it is taken, so later nodes resume from here instead of rescanning
+        bump = 0
         # keep first unchanged; rename others
-        for i, node in enumerate(nodes, start=1):
+        for i, (pos, node) in enumerate(nodes, start=1):
             if i == 1: continue
             # try heuristic
             hx = guess_affinity(node)
             base = name + (hx if hx else args.fallback_suffix.format(n=i))
             new_name = base
-            bump = i
+            bump = max(bump, i)
             while new_name in chosen_names:
                 bump += 1
                 new_name = name + args.fallback_suffix.format(n=bump)
             chosen_names.add(new_name)
-            rename_plan[id(node)] = (name, new_name)
+            planned.append((pos, node, name, new_name))
 
-    if not rename_plan:
+    if not canonical_name:
         print("✅ No duplicates to fix.")
         return
 
-    print("Planned renames:")
-    for ch in order:
-        nid = id(ch)
-        if nid in rename_plan:
-            old, new = rename_plan[nid]
-            ln = getattr(ch, "sourceline", None) if HAVE_LXML else None
-            print(f"  - {localname(ch.tag)} {old} -> {new}" + (f" (line {ln})" if ln else ""))
-
-    # 3) apply @name changes
-    for ch in order:
-        nid = id(ch)
-        if nid in rename_plan:
-            _, new = rename_plan[nid]
-            ch.set("name", new)
+    # 3) report and apply @name changes in document order, walking only the
+    #    planned nodes rather than the schema's children again
+    planned.sort(key=itemgetter(0))
+    # one write for the whole plan; per-line print() is slow on big change sets
+    plan_lines = []
+    for _, ch, old, new in planned:
+        ln = ch.sourceline
+        plan_lines.append(f"  - {localname(ch.tag)} {old} -> {new}" + (f" (line {ln})" if ln else ""))
+        ch.set("name", new)
+    sys.stdout.write("Planned renames:\n" + "\n".join(plan_lines) + "\n")
 
     # 4) update references globally to canonical names (the unchanged first one)
-    changed_groups = {old for (_, (old, _)) in rename_plan.items()}
+    changed_groups = set(canonical_name)
     updates = 0
-    for e in iter_all(root):
+    for e in root.iter():
         for a in REF_ATTRS:
             v = e.get(a)
             if not v: continue
-            if ":" in v:
-                pfx, lname = v.split(":",1); prefix = pfx + ":"
-            else:
-                lname = v; prefix = ""
-            if lname in changed_groups:
-                canon = canonical_name.get(lname, lname)
-                nv = prefix + canon
-                if nv != v:
-                    e.set(a, nv); updates += 1
+            # reject misses on the local name alone; the prefix is only split
+            # out for the rare value that actually names a changed group
+            i = v.find(":") + 1
+            lname = v[i:]
+            if lname not in changed_groups: continue
+            canon = canonical_name.get(lname, lname)
+            nv = v[:i] + canon
+            if nv != v:
+                e.set(a, nv); updates += 1
 
     print(f"Updated {updates} QName reference(s) to canonical declarations.")
 
@@ -143,10 +136,8 @@ def main():
         print("--dry-run: not writing output.")
         return
 
-    if HAVE_LXML:
-        tree.write(args.output, pretty_print=True, xml_declaration=True, encoding="utf-8")
-    else:
-        tree.write(args.output, xml_declaration=True, encoding="utf-8")
+    # write() to a path streams to disk; no need for xmlfile()
+    tree.write(args.output, pretty_print=True, xml_declaration=True, encoding="utf-8")
     print(f"✅ Wrote cleaned schema -> {args.output}")
 
 if __name__ == "__main__":